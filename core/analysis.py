@@ -0,0 +1,182 @@
+"""
+Bulk position analysis across a pool of Stockfish processes.
+
+Run:   python -m core.analysis positions.txt --engines 8 --depth 18 --multipv 3 -o results.jsonl
+       (one FEN per line; use - to read from stdin)
+"""
+import argparse
+import json
+import os
+import sys
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+import chess
+
+from core.engine import ENGINE_DEFAULT_DEPTH, EnginePool
+from core.position_index import get_position_index
+
+
+def position_key(fen):
+    """FEN without the move clocks, so the same position reached twice is analysed once."""
+    return " ".join(fen.split()[:4])
+
+
+def estimate_cost(board):
+    """Rough relative search cost: wider, busier positions take longer to reach a given depth."""
+    return board.legal_moves.count() + len(board.piece_map())
+
+
+def top_moves_by_nodes(engine, fen, nodes):
+    """
+    Node-budget counterpart of get_top_moves, which in the stockfish wrapper
+    (3.28) only searches to a depth: sends `go nodes` and keeps the last
+    exact score of each principal variation. Scores are from White's point of
+    view, like the wrapper's. The engine's MultiPV option sets how many lines.
+    """
+    engine._put(f"go nodes {nodes}")
+    latest = {}
+    while True:
+        fields = engine._read_line().split(" ")
+        if fields[0] == "bestmove":
+            if fields[1] == "(none)":
+                return []
+            break
+        if fields[0] != "info" or "multipv" not in fields or "pv" not in fields or "score" not in fields:
+            continue
+        if "lowerbound" in fields or "upperbound" in fields:
+            continue
+        latest[int(fields[fields.index("multipv") + 1])] = fields
+
+    sign = 1 if fen.split()[1] == "w" else -1
+    lines = []
+    for _, fields in sorted(latest.items()):
+        kind, value = fields[fields.index("score") + 1:fields.index("score") + 3]
+        lines.append({
+            "Move": fields[fields.index("pv") + 1],
+            "Centipawn": int(value) * sign if kind == "cp" else None,
+            "Mate": int(value) * sign if kind == "mate" else None,
+        })
+    return lines
+
+
+def analyse_position(engine, fen, depth=None, nodes=None, multipv=1):
+    if engine.get_parameters()["MultiPV"] != multipv:
+        engine.update_engine_parameters({"MultiPV": multipv})
+    engine.set_fen_position(fen)
+    if depth:
+        engine.set_depth(depth)
+    if nodes:
+        lines = top_moves_by_nodes(engine, fen, nodes)
+    else:
+        lines = engine.get_top_moves(multipv)
+    return [
+        {"move": line["Move"], "centipawn": line["Centipawn"], "mate": line["Mate"]}
+        for line in lines
+    ]
+
+
+def analyse_positions(fens, engines=None, depth=None, nodes=None, multipv=1, hash_mb=64, use_index=True):
+    """
+    Analyses FENs concurrently, one search per engine process.
+
+    Duplicate positions are searched once, and the most expensive positions
+    are started first so no engine is left with a long tail at the end.
+    The input is consumed in full before searching starts, since both of
+    those need to see every position.
+    Single-line depth searches of positions already in the precomputed
+    position index, analysed at least as deep, are answered from it without
+    an engine ("source": "index").
+    Yields one result dict per unique position as soon as it completes.
+    """
+    # A node budget has no depth to compare against, so always search
+    index = get_position_index() if use_index and multipv == 1 and not nodes else None
+    min_depth = depth or ENGINE_DEFAULT_DEPTH
+    engines = engines or os.cpu_count() or 1
+    positions = {}
+    order = []
+    for position, fen in enumerate(fens):
+        fen = fen.strip()
+        if not fen:
+            continue
+        key = position_key(fen)
+        if key not in positions:
+            positions[key] = {"fen": fen, "indices": []}
+            order.append(key)
+        positions[key]["indices"].append(position)
+
+    jobs = []
+    for key in order:
+        entry = positions[key]
+        try:
+            board = chess.Board(entry["fen"])
+        except ValueError:
+            yield {**entry, "error": "Invalid FEN"}
+            continue
+        if not board.is_valid():
+            yield {**entry, "error": "Illegal position"}
+            continue
+        known = index.lookup(board, min_depth) if index is not None else None
+        if known is not None:
+            evaluation = known["eval"]
+            yield {**entry, "source": "index", "depth": known["depth"], "lines": [{
+                "move": known["best_move"],
+                "centipawn": evaluation["value"] if evaluation["type"] == "cp" else None,
+                "mate": evaluation["value"] if evaluation["type"] == "mate" else None,
+            }]}
+            continue
+        jobs.append((estimate_cost(board), entry))
+    jobs.sort(key=lambda job: -job[0])
+
+    if not jobs:
+        return
+
+    # One search thread per engine so the pool spreads across cores
+    pool = EnginePool(min(engines, len(jobs)), parameters={"Threads": 1, "Hash": hash_mb, "MultiPV": multipv})
+    if pool.available == 0:
+        for _, entry in jobs:
+            yield {**entry, "error": "Stockfish not available"}
+        return
+
+    def run(entry):
+        with pool.acquire() as engine:
+            return analyse_position(engine, entry["fen"], depth, nodes, multipv)
+
+    with ThreadPoolExecutor(max_workers=pool.available) as executor:
+        futures = {executor.submit(run, entry): entry for _, entry in jobs}
+        for future in as_completed(futures):
+            entry = futures[future]
+            try:
+                yield {**entry, "lines": future.result()}
+            except Exception as e:
+                yield {**entry, "error": str(e)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Analyse many FENs across a pool of Stockfish engines")
+    parser.add_argument("input", help="File with one FEN per line, or - for stdin")
+    parser.add_argument("-o", "--output", help="JSON lines output file (default: stdout)")
+    parser.add_argument("--engines", type=int, default=os.cpu_count(), help="Number of Stockfish processes")
+    parser.add_argument("--depth", type=int, default=None, help="Fixed search depth")
+    parser.add_argument("--nodes", type=int, default=None, help="Node budget per position (instead of depth)")
+    parser.add_argument("--multipv", type=int, default=1, help="Number of principal variations")
+    parser.add_argument("--hash", type=int, default=64, help="Hash size per engine in MB")
+    parser.add_argument("--no-index", action="store_true", help="Do not answer from the position index")
+    args = parser.parse_args()
+
+    source = sys.stdin if args.input == "-" else open(args.input)
+    output = open(args.output, "w") if args.output else sys.stdout
+    try:
+        fens = [line for line in source]
+        for result in analyse_positions(fens, args.engines, args.depth, args.nodes, args.multipv, args.hash,
+                                        use_index=not args.no_index):
+            output.write(json.dumps(result) + "\n")
+            output.flush()
+    finally:
+        if source is not sys.stdin:
+            source.close()
+        if output is not sys.stdout:
+            output.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,90 @@
+"""
+Model backends for the piece classifier.
+
+Every backend exposes `predict(batch, verbose=0)` taking a float32 array of
+shape (N, 100, 100, 3) in 0-1 and returning (N, 13) class probabilities,
+so BoardClassifier and the evaluation harness can use any of them.
+"""
+import os
+
+import numpy as np
+
+
+class KerasBackend:
+    name = "keras"
+
+    def __init__(self, model_path):
+        from tensorflow.keras.models import load_model
+        self.model = load_model(model_path)
+
+    def predict(self, batch, verbose=0):
+        # Keras would otherwise split the call into chunks of 32 images
+        return np.asarray(self.model.predict(batch, batch_size=len(batch), verbose=verbose))
+
+
+class TFLiteBackend:
+    """TensorFlow Lite models, including int8/uint8 quantized ones."""
+    name = "tflite"
+
+    def __init__(self, model_path):
+        try:
+            from tflite_runtime.interpreter import Interpreter
+        except ImportError:
+            from tensorflow.lite import Interpreter
+        self.interpreter = Interpreter(model_path=model_path)
+        self.interpreter.allocate_tensors()
+        self.input = self.interpreter.get_input_details()[0]
+        self.output = self.interpreter.get_output_details()[0]
+        self.batch_size = None
+
+    def predict(self, batch, verbose=0):
+        if batch.shape[0] != self.batch_size:
+            self.interpreter.resize_tensor_input(self.input['index'], batch.shape)
+            self.interpreter.allocate_tensors()
+            self.input = self.interpreter.get_input_details()[0]
+            self.output = self.interpreter.get_output_details()[0]
+            self.batch_size = batch.shape[0]
+
+        if self.input['dtype'] != np.float32:
+            scale, zero_point = self.input['quantization']
+            batch = np.round(batch / scale + zero_point).astype(self.input['dtype'])
+        self.interpreter.set_tensor(self.input['index'], batch)
+        self.interpreter.invoke()
+        output = self.interpreter.get_tensor(self.output['index'])
+
+        if self.output['dtype'] != np.float32:
+            scale, zero_point = self.output['quantization']
+            output = (output.astype(np.float32) - zero_point) * scale
+        return output
+
+
+class OnnxBackend:
+    name = "onnx"
+
+    def __init__(self, model_path):
+        import onnxruntime
+        self.session = onnxruntime.InferenceSession(model_path)
+        self.input_name = self.session.get_inputs()[0].name
+
+    def predict(self, batch, verbose=0):
+        return self.session.run(None, {self.input_name: batch.astype(np.float32)})[0]
+
+
+BACKENDS = {
+    ".h5": KerasBackend,
+    ".keras": KerasBackend,
+    ".tflite": TFLiteBackend,
+    ".onnx": OnnxBackend,
+}
+
+
+def load_backend(model_path):
+    """Picks a backend from the model file extension (a directory is a Keras SavedModel)."""
+    if os.path.isdir(model_path):
+        return KerasBackend(model_path)
+    extension = os.path.splitext(model_path)[1].lower()
+    if extension not in BACKENDS:
+        raise ValueError(f"Unsupported model format: {model_path}")
+    if not os.path.exists(model_path):
+        raise OSError(f"Model not found at {model_path}")
+    return BACKENDS[extension](model_path)
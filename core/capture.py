@@ -1,5 +1,8 @@
+import atexit
 import os
 import platform
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from PIL import Image
 from PIL import ImageGrab
 
@@ -118,14 +121,11 @@ def grab_screen(target_name=None):
         
         if not window_id:
             print("No browser or target window found!")
-            # Fallback to full screen
+            # Fallback to the monitor showing a board (or the primary one)
             try:
-                with mss.mss() as sct:
-                    monitor = sct.monitors[1]
-                    screenshot = sct.grab(monitor)
-                    img = Image.frombytes("RGB", screenshot.size, screenshot.bgra, "raw", "BGRX")
-                    print("Captured full screen (no specific window found)")
-                    return img
+                img = grab_board_monitor()
+                print("Captured full screen (no specific window found)")
+                return img
             except Exception as e:
                 print(f"Error capturing screen: {e}")
                 return None
@@ -223,12 +223,135 @@ def grab_screen(target_name=None):
                     img = Image.frombytes("RGB", screenshot.size, screenshot.bgra, "raw", "BGRX")
                     print(f"Captured window: {title} ({window_geometry['width']}x{window_geometry['height']})")
                 else:
-                    # Fallback to full screen
-                    monitor = sct.monitors[1]
-                    screenshot = sct.grab(monitor)
-                    img = Image.frombytes("RGB", screenshot.size, screenshot.bgra, "raw", "BGRX")
+                    # Fallback to the monitor showing a board (or the primary one)
+                    img = grab_board_monitor()
                     print(f"Captured full screen (could not get window geometry for: {title})")
                 return img
         except Exception as e:
             print(f"Error capturing screen: {e}")
-            return None
\ No newline at end of file
+            return None
+
+def grab_monitor_array(sct, monitor_index=1, region=None):
+    """
+    Grabs a monitor (or a {'left','top','width','height'} region) with an
+    existing mss context and returns it as a BGRA numpy array, without going
+    through PIL. Meant for continuous capture loops.
+    """
+    import numpy as np
+
+    monitor = region if region is not None else sct.monitors[monitor_index]
+    return np.asarray(sct.grab(monitor))
+
+
+# One long-lived worker per monitor, each holding its own mss context:
+# mss objects are not thread-safe and are expensive to recreate per frame.
+# Contexts are only ever opened on the pool's threads, and closed by
+# close_capture_pool() once those threads have stopped.
+_capture_local = threading.local()
+_capture_contexts = []
+_capture_pool = None
+_capture_pool_lock = threading.Lock()
+
+
+def _thread_sct():
+    if not hasattr(_capture_local, 'sct'):
+        import mss
+        _capture_local.sct = mss.mss()
+        with _capture_pool_lock:
+            _capture_contexts.append(_capture_local.sct)
+    return _capture_local.sct
+
+
+def _get_capture_pool():
+    """The capture pool, created on first use with one worker per monitor."""
+    global _capture_pool
+    with _capture_pool_lock:
+        if _capture_pool is None:
+            import mss
+            with mss.mss() as sct:
+                monitor_count = len(sct.monitors) - 1
+            _capture_pool = ThreadPoolExecutor(max_workers=max(1, monitor_count), thread_name_prefix='capture')
+        return _capture_pool
+
+
+def close_capture_pool():
+    """Stops the capture workers and closes their mss contexts."""
+    global _capture_pool
+    with _capture_pool_lock:
+        pool, _capture_pool = _capture_pool, None
+    if pool is None:
+        return
+    pool.shutdown(wait=True)
+    with _capture_pool_lock:
+        contexts = _capture_contexts[:]
+        del _capture_contexts[:]
+    for sct in contexts:
+        sct.close()
+
+
+atexit.register(close_capture_pool)
+
+
+def list_monitors():
+    """Returns the mss monitor dicts, index 1..N (index 0 is the combined virtual screen)."""
+    return _get_capture_pool().submit(lambda: list(_thread_sct().monitors)).result()
+
+
+def grab_monitors(monitor_indices=None):
+    """
+    Captures several monitors concurrently.
+    Returns: Dict { monitor_index: BGRA numpy array }
+    """
+    monitors = list_monitors()
+    if monitor_indices is None:
+        monitor_indices = range(1, len(monitors))
+    monitor_indices = list(monitor_indices)
+    pool = _get_capture_pool()
+    futures = {i: pool.submit(lambda i=i: grab_monitor_array(_thread_sct(), region=monitors[i]))
+               for i in monitor_indices}
+    return {i: future.result() for i, future in futures.items()}
+
+
+def _find_boards_on_monitor(monitor_index, monitor):
+    import cv2
+    from core.vision import find_chessboards
+
+    frame = grab_monitor_array(_thread_sct(), region=monitor)
+    bgr = cv2.cvtColor(frame, cv2.COLOR_BGRA2BGR)
+    boards = []
+    for x1, y1, x2, y2 in find_chessboards(bgr):
+        boards.append({
+            'rect': (x1, y1, x2, y2),
+            # Position in virtual screen coordinates, across all monitors
+            'screen_rect': (x1 + monitor['left'], y1 + monitor['top'], x2 + monitor['left'], y2 + monitor['top']),
+        })
+    return {'monitor': monitor_index, 'image': bgr, 'boards': boards}
+
+
+def find_boards_on_monitors(monitor_indices=None):
+    """
+    Captures each monitor and searches it for chessboards, all monitors in
+    parallel. Only monitors that contain at least one board are returned.
+    Returns: list of { 'monitor', 'image' (BGR array), 'boards': [{ 'rect', 'screen_rect' }] }
+    """
+    monitors = list_monitors()
+    if monitor_indices is None:
+        monitor_indices = range(1, len(monitors))
+    monitor_indices = list(monitor_indices)
+    pool = _get_capture_pool()
+    futures = [pool.submit(_find_boards_on_monitor, i, monitors[i]) for i in monitor_indices]
+    return [result for result in (f.result() for f in futures) if result['boards']]
+
+
+def grab_board_monitor(monitor_indices=None):
+    """
+    Full-screen fallback for grab_screen: the first monitor with a board on
+    it, or the primary monitor if none has one. Returns a PIL image.
+    """
+    found = find_boards_on_monitors(monitor_indices)
+    if found:
+        bgr = found[0]['image']
+        print(f"Found a chessboard on monitor {found[0]['monitor']}")
+        return Image.fromarray(bgr[:, :, ::-1].copy())
+    frame = _get_capture_pool().submit(lambda: grab_monitor_array(_thread_sct(), 1)).result()
+    return Image.frombytes("RGB", (frame.shape[1], frame.shape[0]), frame.tobytes(), "raw", "BGRX")
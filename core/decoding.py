@@ -0,0 +1,145 @@
+"""
+Legality-constrained decoding of per-square classifier probabilities.
+
+Instead of taking the argmax of each square independently, keep the top-k
+classes per square and search for the most probable placement that could
+occur in a real game: one king per side, kings not touching, no pawns on
+the back ranks, and piece counts reachable through promotions.
+"""
+import heapq
+
+import numpy as np
+
+EMPTY = "zEmpty"
+START_COUNTS = {"q": 1, "r": 2, "b": 2, "n": 2}
+
+
+def square_rank(index):
+    """Rank (1-8) of a square index in A1, A2, ..., H8 order."""
+    return index % 8 + 1
+
+
+def square_file(index):
+    return index // 8
+
+
+def violations(assignment):
+    """
+    Returns the rule violations of a placement as a list of
+    (kind, color, squares-to-change) tuples. An empty list means legal.
+    `assignment` is a list of 64 category codes in A1..H8 order.
+    """
+    problems = []
+    for color in "wb":
+        king = color + "k"
+        kings = [i for i, code in enumerate(assignment) if code == king]
+        if not kings:
+            problems.append(("missing", king, []))
+        elif len(kings) > 1:
+            problems.append(("excess", king, kings))
+
+        pieces = [i for i, code in enumerate(assignment) if code[0] == color and code != EMPTY]
+        pawns = [i for i in pieces if assignment[i][1] == "p"]
+        extra = sum(
+            max(0, sum(1 for i in pieces if assignment[i][1] == piece) - count)
+            for piece, count in START_COUNTS.items()
+        )
+        if len(pieces) > 16 or len(pawns) + extra > 8:
+            problems.append(("excess", color, [i for i in pieces if assignment[i][1] != "k"]))
+
+    back_rank_pawns = [i for i, code in enumerate(assignment)
+                       if code in ("wp", "bp") and square_rank(i) in (1, 8)]
+    if back_rank_pawns:
+        problems.append(("excess", "backrank", back_rank_pawns))
+
+    kings = [i for i, code in enumerate(assignment) if code in ("wk", "bk")]
+    if len(kings) == 2:
+        a, b = kings
+        if abs(square_file(a) - square_file(b)) <= 1 and abs(square_rank(a) - square_rank(b)) <= 1:
+            problems.append(("excess", "adjacent", kings))
+    return problems
+
+
+def decode_legal_board(probabilities, categories, top_k=3, max_expansions=5000):
+    """
+    Finds the most probable legal placement from a (64, 13) probability array.
+
+    Uniform-cost search over per-square choices among each square's top-k
+    classes: a state's cost is the log-probability lost relative to the
+    argmax, and only squares involved in a violation are changed. The first
+    legal state popped is the best one reachable within the top-k.
+
+    Returns: (list of 64 category codes, list of 64 confidences), or
+    (None, None) if no legal placement was found within max_expansions.
+    """
+    log_probs = np.log(np.clip(probabilities, 1e-12, 1.0))
+    candidates = np.argsort(-log_probs, axis=1)[:, :top_k]
+    best = log_probs[np.arange(64), candidates[:, 0]]
+    category_index = {code: i for i, code in enumerate(categories)}
+
+    def cost_of(square, class_idx):
+        return float(best[square] - log_probs[square, class_idx])
+
+    start = tuple(int(c) for c in candidates[:, 0])
+    queue = [(0.0, start)]
+    seen = {start}
+    expansions = 0
+
+    while queue and expansions < max_expansions:
+        cost, state = heapq.heappop(queue)
+        assignment = [categories[c] for c in state]
+        problems = violations(assignment)
+        if not problems:
+            confidences = [float(probabilities[i, c]) for i, c in enumerate(state)]
+            return assignment, confidences
+        expansions += 1
+
+        # Only fix the first problem; the others are revisited in the children
+        kind, target, squares = problems[0]
+        moves = []
+        if kind == "missing":
+            class_idx = category_index[target]
+            for square in range(64):
+                if class_idx in candidates[square]:
+                    moves.append((square, class_idx))
+        else:
+            for square in squares:
+                for class_idx in candidates[square]:
+                    if class_idx != state[square]:
+                        moves.append((square, int(class_idx)))
+
+        for square, class_idx in moves:
+            child = state[:square] + (class_idx,) + state[square + 1:]
+            if child in seen:
+                continue
+            seen.add(child)
+            child_cost = cost - cost_of(square, state[square]) + cost_of(square, class_idx)
+            heapq.heappush(queue, (child_cost, child))
+
+    return None, None
+
+
+def is_flipped(assignment):
+    """
+    Guesses whether the board was captured from Black's side, from where the
+    pawns and kings are: White's normally sit lower on the board than Black's.
+    """
+    def mean_rank(code):
+        ranks = [square_rank(i) for i, c in enumerate(assignment) if c == code]
+        return sum(ranks) / len(ranks) if ranks else None
+
+    score = 0.0
+    for white, black, weight in (("wp", "bp", 1.0), ("wk", "bk", 0.5)):
+        white_rank, black_rank = mean_rank(white), mean_rank(black)
+        if white_rank is not None and black_rank is not None:
+            score += weight * (black_rank - white_rank)
+        elif white_rank is not None:
+            score += weight * (4.5 - white_rank)
+        elif black_rank is not None:
+            score += weight * (black_rank - 4.5)
+    return score < 0
+
+
+def rotate_assignment(values):
+    """Rotates a 64-entry A1..H8 list by 180 degrees (A1 <-> H8)."""
+    return list(reversed(values))
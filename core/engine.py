@@ -0,0 +1,141 @@
+import os
+import platform
+import queue
+import threading
+from contextlib import contextmanager
+
+import chess
+
+# Depth the stockfish wrapper (3.28) searches to when set_depth is not called
+ENGINE_DEFAULT_DEPTH = 15
+
+
+def get_stockfish_instance(**kwargs):
+    from stockfish import Stockfish, StockfishException
+
+    # 1. Check local 'engines' folder
+    binary_name = "stockfish.exe" if platform.system() == 'Windows' else "stockfish"
+    local_path = os.path.join(os.getcwd(), "engines", binary_name)
+
+    if os.path.exists(local_path):
+        try:
+            return Stockfish(path=local_path, **kwargs)
+        except Exception as e:
+            print(f"Warning: Found binary at {local_path} but failed to load: {e}")
+
+    # 2. Check Global PATH
+    try:
+        return Stockfish(**kwargs)
+    except (FileNotFoundError, StockfishException):
+        return None
+
+
+class EnginePool:
+    """A fixed set of warm Stockfish processes shared between threads."""
+
+    def __init__(self, size=2, **engine_kwargs):
+        self.size = size
+        self.engines = queue.Queue()
+        for _ in range(size):
+            engine = get_stockfish_instance(**engine_kwargs)
+            if engine is None:
+                break
+            self.engines.put(engine)
+        self.available = self.engines.qsize()
+
+    @contextmanager
+    def acquire(self, timeout=None):
+        """Borrows an engine for the duration of a `with` block."""
+        engine = self.engines.get(timeout=timeout)
+        try:
+            yield engine
+        finally:
+            self.engines.put(engine)
+
+
+def find_connecting_move(board, target):
+    """
+    Returns (start, move) where `move` is legal from `start` and leaves the
+    pieces as in `target`, or (None, None).
+
+    Only the piece placement is compared: recognized FENs carry a fixed side
+    to move and no castling rights, so the side to move is taken from
+    whichever side could have made the move. `start` is `board`, or a copy
+    of it with the other side to move.
+    """
+    target_placement = target.board_fen()
+    candidates = [board]
+    flipped = board.copy(stack=False)
+    flipped.turn = not board.turn
+    flipped.ep_square = None
+    candidates.append(flipped)
+
+    for start in candidates:
+        for move in start.legal_moves:
+            start.push(move)
+            matched = start.board_fen() == target_placement
+            start.pop()
+            if matched:
+                return start, move
+    return None, None
+
+
+class EngineSession:
+    """
+    Keeps one Stockfish process across consecutive positions.
+
+    When a new position is one legal move away from the previous one, the
+    session plays that move on its own board and sends the result without
+    `ucinewgame`, so Stockfish keeps its transposition table and the next
+    search reaches a useful depth sooner. Otherwise the engine is reset to
+    the new FEN.
+
+    Relies on the `send_ucinewgame_token` argument of the stockfish wrapper's
+    set_fen_position (pinned in requirements.txt).
+    """
+
+    def __init__(self, engine):
+        self.engine = engine
+        self.board = None
+        # Callers analysing from several threads must hold this around
+        # set_position() and the engine query that follows it.
+        self.lock = threading.Lock()
+        self.resets = 0
+
+    def set_position(self, fen):
+        """Returns True if the engine state was kept, False if it was reset."""
+        target = chess.Board(fen)
+        if self.board is not None:
+            if self.board.board_fen() == target.board_fen():
+                settings = (target.turn, target.castling_rights, target.ep_square)
+                if (self.board.turn, self.board.castling_rights, self.board.ep_square) != settings:
+                    # Same pieces but a different side to move, castling or en passant
+                    self.board = target
+                    self.engine.set_fen_position(fen, send_ucinewgame_token=False)
+                return True
+            start, move = find_connecting_move(self.board, target)
+            if move is not None:
+                start.push(move)
+                self.board = start
+                self.engine.set_fen_position(self.board.fen(), send_ucinewgame_token=False)
+                return True
+
+        self.engine.set_fen_position(fen, send_ucinewgame_token=True)
+        self.board = target
+        self.resets += 1
+        return False
+
+
+_session = None
+_session_lock = threading.Lock()
+
+
+def get_engine_session():
+    """Shared session reused by every analysis window, or None without Stockfish."""
+    global _session
+    with _session_lock:
+        if _session is None:
+            engine = get_stockfish_instance()
+            if engine is not None:
+                _session = EngineSession(engine)
+        return _session
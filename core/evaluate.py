@@ -0,0 +1,179 @@
+"""
+Evaluation harness for saved piece classifiers.
+
+Reports accuracy and a confusion matrix over the 13 categories on a held-out
+split, throughput for several batch sizes, and per-board (64 squares)
+latency percentiles. Results are written to <model>.eval.json.
+
+The images come from the <model>.holdout.json test split that
+scripts/train_model.py saves next to each model. For models without one,
+such as TFLite or ONNX conversions, pass --holdout with the split of the
+model they came from, or --datadir with images the model has never seen.
+
+Run:   python -m core.evaluate models/model.h5 [models/model_int8.tflite ...]
+"""
+import argparse
+import json
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import cv2
+import numpy as np
+
+from core.backends import load_backend
+from core.inference import BoardClassifier
+
+BATCH_SIZES = [1, 8, 32, 64, 128, 256]
+
+
+def holdout_path(model_path):
+    """Test split written by scripts/train_model.py next to the model."""
+    return f"{os.path.splitext(model_path.rstrip(os.sep))[0]}.holdout.json"
+
+
+def load_holdout(path):
+    """
+    The images held out when a model was trained.
+    Returns: list of (image path, class index), or None if no list was saved.
+    """
+    if not os.path.exists(path):
+        return None
+    with open(path) as f:
+        return [(img_path, class_num) for img_path, class_num in json.load(f)["samples"]]
+
+
+def list_dataset(datadir):
+    """Every image of a directory laid out like assets/dataset, for models never trained on it."""
+    categories = BoardClassifier().categories
+    samples = []
+    for class_num, category in enumerate(categories):
+        category_dir = os.path.join(datadir, category)
+        if os.path.isdir(category_dir):
+            samples.extend((os.path.join(category_dir, img), class_num) for img in sorted(os.listdir(category_dir)))
+    return samples
+
+
+def load_images(samples, workers=None):
+    """Reads and preprocesses images in parallel (OpenCV releases the GIL)."""
+    classifier = BoardClassifier()
+
+    def load(sample):
+        img = cv2.imread(sample[0], cv2.IMREAD_ANYCOLOR)
+        return None if img is None else classifier.preprocess_array(img)
+
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        images = list(executor.map(load, samples))
+
+    X, Y = [], []
+    for (path, class_num), img in zip(samples, images):
+        if img is None:
+            print(f"Error reading image: {path}")
+            continue
+        X.append(img)
+        Y.append(class_num)
+    return np.stack(X), np.array(Y)
+
+
+def confusion_matrix(y_true, y_pred, num_classes):
+    matrix = np.zeros((num_classes, num_classes), dtype=int)
+    np.add.at(matrix, (y_true, y_pred), 1)
+    return matrix
+
+
+def measure_throughput(backend, X, batch_sizes=BATCH_SIZES, repeats=3):
+    """Images per second for each batch size (best of `repeats`)."""
+    results = {}
+    for batch_size in batch_sizes:
+        batch = X[np.arange(batch_size) % len(X)]
+        backend.predict(batch)  # warm up, e.g. TFLite tensor reallocation
+        best = float("inf")
+        for _ in range(repeats):
+            start = time.perf_counter()
+            backend.predict(batch)
+            best = min(best, time.perf_counter() - start)
+        results[batch_size] = batch_size / best
+    return results
+
+
+def measure_board_latency(backend, X, runs=100):
+    """p50/p99 latency in ms of classifying one full board (64 squares in one call)."""
+    board = X[np.arange(64) % len(X)]
+    backend.predict(board)
+    timings = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        backend.predict(board)
+        timings.append((time.perf_counter() - start) * 1000)
+    return {"p50_ms": float(np.percentile(timings, 50)), "p99_ms": float(np.percentile(timings, 99))}
+
+
+def evaluate_model(model_path, X, Y, categories, latency_runs=100):
+    backend = load_backend(model_path)
+    predicted = np.concatenate([
+        np.argmax(backend.predict(X[i:i + 256]), axis=1) for i in range(0, len(X), 256)
+    ])
+    matrix = confusion_matrix(Y, predicted, len(categories))
+    return {
+        "model": model_path,
+        "backend": backend.name,
+        "samples": int(len(Y)),
+        "accuracy": float(np.mean(predicted == Y)),
+        "categories": categories,
+        "confusion_matrix": matrix.tolist(),
+        "throughput_images_per_sec": {str(k): v for k, v in measure_throughput(backend, X).items()},
+        "board_latency": measure_board_latency(backend, X, latency_runs),
+    }
+
+
+def print_report(report):
+    print(f"\n{report['model']} ({report['backend']})")
+    print(f"Accuracy: {report['accuracy']:.4f} on {report['samples']} images")
+    categories = report["categories"]
+    print("Confusion matrix (rows: true, columns: predicted)")
+    print("       " + "".join(f"{c[:6]:>7}" for c in categories))
+    for category, row in zip(categories, report["confusion_matrix"]):
+        print(f"{category[:6]:>7}" + "".join(f"{v:>7}" for v in row))
+    print("Batch size -> images/sec")
+    for batch_size, rate in report["throughput_images_per_sec"].items():
+        print(f"  {batch_size:>5}: {rate:10.1f}")
+    latency = report["board_latency"]
+    print(f"Per-board latency: p50 {latency['p50_ms']:.2f} ms, p99 {latency['p99_ms']:.2f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Evaluate saved piece classifiers")
+    parser.add_argument("models", nargs="+", help="Model files (.h5, .keras, .tflite, .onnx)")
+    parser.add_argument("--datadir", default=None,
+                        help="Evaluate on every image in this directory instead of the model's saved test split")
+    parser.add_argument("--holdout", default=None,
+                        help="Test split to use for every model, e.g. the .holdout.json of the Keras model a TFLite/ONNX file was converted from")
+    parser.add_argument("--workers", type=int, default=None, help="Image loading threads")
+    parser.add_argument("--latency-runs", type=int, default=100)
+    args = parser.parse_args()
+
+    categories = BoardClassifier().categories
+    loaded = {}
+    for model_path in args.models:
+        if args.datadir:
+            samples = list_dataset(args.datadir)
+        else:
+            samples = load_holdout(args.holdout or holdout_path(model_path))
+        if not samples:
+            print(f"Skipping {model_path}: no test split found, pass --holdout or --datadir with unseen images")
+            continue
+        key = tuple(samples)
+        if key not in loaded:
+            loaded[key] = load_images(samples, args.workers)
+        X, Y = loaded[key]
+
+        report = evaluate_model(model_path, X, Y, categories, args.latency_runs)
+        print_report(report)
+        output_path = f"{os.path.splitext(model_path.rstrip(os.sep))[0]}.eval.json"
+        with open(output_path, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"Saved {output_path}")
+
+
+if __name__ == "__main__":
+    main()
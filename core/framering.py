@@ -0,0 +1,212 @@
+"""
+Shared-memory frame ring between a capture process and a recognition process.
+
+Frames are written into a fixed number of slots in a multiprocessing
+shared_memory block instead of being pickled through a queue. Each slot
+carries the sequence number of the frame it holds; the reader always takes
+the newest frame and skips anything older, so latency stays bounded when
+recognition is slower than capture.
+
+Run:   python -m core.framering --fps 10 --monitor 1
+"""
+import argparse
+import multiprocessing as mp
+import queue
+import time
+from multiprocessing import shared_memory
+
+import numpy as np
+
+# Header layout (int64): [latest_seq, slot0_seq, slot0_h, slot0_w, slot1_seq, ...]
+_SLOT_FIELDS = 3
+_WRITING = -1
+
+
+class FrameRing:
+    def __init__(self, name=None, slots=4, max_height=2160, max_width=3840, channels=4, create=False):
+        self.slots = slots
+        self.frame_shape = (max_height, max_width, channels)
+        header_size = (1 + _SLOT_FIELDS * slots) * 8
+        frame_size = max_height * max_width * channels
+        size = header_size + frame_size * slots
+
+        self.shm = shared_memory.SharedMemory(name=name, create=create, size=size if create else 0)
+        self.name = self.shm.name
+        self.owner = create
+        self.header = np.ndarray((1 + _SLOT_FIELDS * slots,), dtype=np.int64, buffer=self.shm.buf)
+        self.frames = np.ndarray((slots,) + self.frame_shape, dtype=np.uint8,
+                                 buffer=self.shm.buf, offset=header_size)
+        if create:
+            self.header[:] = 0
+        self.last_read = 0
+        self.dropped = 0
+
+    @classmethod
+    def create(cls, **kwargs):
+        return cls(create=True, **kwargs)
+
+    @classmethod
+    def attach(cls, name, **kwargs):
+        """Attaches to a ring created by another process. Geometry must match."""
+        return cls(name=name, create=False, **kwargs)
+
+    def _slot_header(self, slot):
+        start = 1 + slot * _SLOT_FIELDS
+        return self.header[start:start + _SLOT_FIELDS]
+
+    def write(self, frame):
+        """Copies a frame into the next slot. Returns its sequence number."""
+        height, width = frame.shape[:2]
+        max_height, max_width, channels = self.frame_shape
+        if height > max_height or width > max_width or frame.shape[2] != channels:
+            raise ValueError(f"Frame {frame.shape} does not fit ring slots {self.frame_shape}")
+
+        seq = int(self.header[0]) + 1
+        slot_header = self._slot_header(seq % self.slots)
+        # Mark the slot as being written so a reader never takes a torn frame
+        slot_header[0] = _WRITING
+        self.frames[seq % self.slots, :height, :width] = frame
+        slot_header[1], slot_header[2] = height, width
+        slot_header[0] = seq
+        self.header[0] = seq
+        return seq
+
+    def read_latest(self):
+        """
+        Returns (seq, frame copy) for the newest complete frame, or (None, None)
+        when nothing newer than the previous read is available. Frames that
+        were overwritten before being read are counted in self.dropped.
+        """
+        seq = int(self.header[0])
+        if seq <= self.last_read:
+            return None, None
+
+        slot = seq % self.slots
+        slot_header = self._slot_header(slot)
+        if int(slot_header[0]) != seq:
+            return None, None
+        height, width = int(slot_header[1]), int(slot_header[2])
+        frame = self.frames[slot, :height, :width].copy()
+        # The writer may have lapped us while copying
+        if int(slot_header[0]) != seq:
+            return None, None
+
+        self.dropped += seq - self.last_read - 1 if self.last_read else 0
+        self.last_read = seq
+        return seq, frame
+
+    def close(self):
+        # Drop numpy views before closing the mapping
+        self.header = None
+        self.frames = None
+        self.shm.close()
+        if self.owner:
+            self.shm.unlink()
+
+
+def capture_worker(ring_name, ring_kwargs, stop_event, fps=10, monitor_index=1):
+    """Grabs the monitor at a steady rate and writes each frame into the ring."""
+    import mss
+    from core.capture import grab_monitor_array
+
+    ring = FrameRing.attach(ring_name, **ring_kwargs)
+    interval = 1.0 / fps
+    try:
+        with mss.mss() as sct:
+            while not stop_event.is_set():
+                start = time.perf_counter()
+                ring.write(grab_monitor_array(sct, monitor_index))
+                time.sleep(max(0.0, interval - (time.perf_counter() - start)))
+    finally:
+        ring.close()
+
+
+def recognition_worker(ring_name, ring_kwargs, stop_event, results, model_path='models/model.h5'):
+    """Recognizes the newest frame in the ring, skipping any it could not keep up with."""
+    import cv2
+    from core.inference import BoardClassifier
+
+    ring = FrameRing.attach(ring_name, **ring_kwargs)
+    classifier = BoardClassifier(model_path)
+    classifier.load_model()
+    try:
+        while not stop_event.is_set():
+            seq, frame = ring.read_latest()
+            if frame is None:
+                time.sleep(0.002)
+                continue
+            boards = classifier.predict_boards_in_image(cv2.cvtColor(frame, cv2.COLOR_BGRA2BGR))
+            results.put({
+                "seq": seq,
+                "dropped": ring.dropped,
+                "boards": [{"fen": b["fen"], "rect": b["rect"]} for b in boards],
+            })
+    finally:
+        ring.close()
+
+
+def start_pipeline(fps=10, monitor_index=1, slots=4, max_height=None, max_width=None, model_path='models/model.h5'):
+    """
+    Starts capture and recognition in separate processes connected by a
+    FrameRing. Slots are sized from one grab of the monitor unless
+    max_height and max_width are given: on HiDPI screens (e.g. Retina) mss
+    returns physical pixels, larger than the logical size in sct.monitors.
+    Returns (ring, stop_event, results_queue, processes); set stop_event and
+    join the processes, then close the ring, to shut down.
+    """
+    if max_height is None or max_width is None:
+        import mss
+        from core.capture import grab_monitor_array
+        with mss.mss() as sct:
+            max_height, max_width = grab_monitor_array(sct, monitor_index).shape[:2]
+    ring_kwargs = {"slots": slots, "max_height": max_height, "max_width": max_width}
+    ring = FrameRing.create(**ring_kwargs)
+    stop_event = mp.Event()
+    results = mp.Queue()
+    processes = [
+        mp.Process(target=capture_worker, name="capture", daemon=True,
+                   args=(ring.name, ring_kwargs, stop_event, fps, monitor_index)),
+        mp.Process(target=recognition_worker, name="recognition", daemon=True,
+                   args=(ring.name, ring_kwargs, stop_event, results, model_path)),
+    ]
+    for process in processes:
+        process.start()
+    return ring, stop_event, results, processes
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Continuous capture and recognition over a shared-memory ring")
+    parser.add_argument("--fps", type=float, default=10)
+    parser.add_argument("--monitor", type=int, default=1)
+    parser.add_argument("--slots", type=int, default=4)
+    parser.add_argument("--model", default="models/model.h5")
+    args = parser.parse_args()
+
+    ring, stop_event, results, processes = start_pipeline(args.fps, args.monitor, args.slots, model_path=args.model)
+    last_fens = None
+    try:
+        while True:
+            try:
+                result = results.get(timeout=1)
+            except queue.Empty:
+                dead = [p for p in processes if not p.is_alive()]
+                if dead:
+                    for process in dead:
+                        print(f"Error: {process.name} exited with code {process.exitcode}")
+                    break
+                continue
+            fens = [board["fen"] for board in result["boards"]]
+            if fens != last_fens:
+                print(f"Frame {result['seq']} (dropped {result['dropped']}): {fens}")
+                last_fens = fens
+    except KeyboardInterrupt:
+        pass
+    finally:
+        stop_event.set()
+        for process in processes:
+            process.join(timeout=2)
+        ring.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -26,3 +26,18 @@ def square_maker(img, cropped):
     width, height = cropped.size
     square_size = width // 8
     crop_chess_board_squares(cropped, output_folder, square_size)
+
+def split_board_squares(board_array):
+    """
+    Splits a cropped board (numpy array, white at the bottom) into its 64 squares
+    in memory, without writing them to disk.
+    Returns: Dict { 'A1': array, ..., 'H8': array }
+    """
+    letters = ["A", "B", "C", "D", "E", "F", "G", "H"]
+    square_size = board_array.shape[1] // 8
+    squares = {}
+    for i in range(8):
+        for j in range(8):
+            upper, left = i * square_size, j * square_size
+            squares[f"{letters[j]}{8 - i}"] = board_array[upper:upper + square_size, left:left + square_size]
+    return squares
@@ -4,22 +4,10 @@ import threading
 import tkinter as tk
 import webbrowser
 import chess
-import platform
 from tkinter import messagebox
 from PIL import Image, ImageTk
-from stockfish import Stockfish, StockfishException
-
-# Try importing your local modules
-try:
-    from core.inference import BoardClassifier
-    from core.utils import rotate_board_and_change_side
-except ImportError:
-    pass 
-
-PIECE_MAP = {
-    "bb": "b", "bk": "k", "bn": "n", "bp": "p", "bq": "q", "br": "r",
-    "wb": "B", "wk": "K", "wn": "N", "wp": "P", "wq": "Q", "wr": "R",
-}
+from core.engine import ENGINE_DEFAULT_DEPTH, get_engine_session
+from core.position_index import get_position_index
 
 COLORS = {
     'bg': '#1e1e1e',
@@ -35,25 +23,8 @@ COLORS = {
     'dark_square': '#B58863'
 }
 
-def get_stockfish_instance():
-    # 1. Check local 'engines' folder
-    binary_name = "stockfish.exe" if platform.system() == 'Windows' else "stockfish"
-    local_path = os.path.join(os.getcwd(), "engines", binary_name)
-    
-    if os.path.exists(local_path):
-        try:
-            return Stockfish(path=local_path)
-        except Exception as e:
-            print(f"Warning: Found binary at {local_path} but failed to load: {e}")
-
-    # 2. Check Global PATH
-    try:
-        return Stockfish() 
-    except (FileNotFoundError, StockfishException):
-        return None
-
 class ChessBoardGUI(tk.Toplevel):
-    def __init__(self, fen, stockfish_engine=None):
+    def __init__(self, fen, engine_session=None):
         super().__init__()
         self.title("Chess Analysis Board")
         self.geometry("500x680")
@@ -61,7 +32,7 @@ class ChessBoardGUI(tk.Toplevel):
         self.resizable(False, False)
         
         self.fen = fen if fen else chess.STARTING_FEN
-        self.stockfish = stockfish_engine
+        self.session = engine_session
         self.board = chess.Board(self.fen)
         self.images = [] 
 
@@ -102,7 +73,7 @@ class ChessBoardGUI(tk.Toplevel):
                   command=lambda: self.open_lichess('analysis'), **btn_style).pack(side=tk.LEFT, padx=5)
         
         # Row 2: Stockfish
-        if self.stockfish:
+        if self.session:
             row2 = tk.Frame(control_frame, bg=COLORS['secondary_bg'])
             row2.pack(pady=(0, 15))
             
@@ -147,14 +118,24 @@ class ChessBoardGUI(tk.Toplevel):
                     file_idx, rank_idx = chess.square_file(square), 7 - chess.square_rank(square)
                     self.canvas.create_image(file_idx*50+25, rank_idx*50+25, image=photo, tags="piece")
 
+    def lookup_index(self):
+        """Precomputed result for this position, if the position index has one."""
+        index = get_position_index()
+        return index.lookup(self.board, ENGINE_DEFAULT_DEPTH) if index is not None else None
+
     def start_best_move_thread(self):
         self.lbl_info.config(text="Calculating...", fg=COLORS['info'])
         threading.Thread(target=self.calculate_best_move, daemon=True).start()
 
     def calculate_best_move(self):
         try:
-            self.stockfish.set_fen_position(self.fen)
-            move = self.stockfish.get_best_move()
+            known = self.lookup_index()
+            if known is not None:
+                move = known['best_move']
+            else:
+                with self.session.lock:
+                    self.session.set_position(self.fen)
+                    move = self.session.engine.get_best_move()
             if move:
                 text = f"♔ Best: {move}"
                 self.after(0, lambda: self.lbl_info.config(text=text, fg=COLORS['info']))
@@ -170,8 +151,13 @@ class ChessBoardGUI(tk.Toplevel):
 
     def calculate_eval(self):
         try:
-            self.stockfish.set_fen_position(self.fen)
-            eval_data = self.stockfish.get_evaluation()
+            known = self.lookup_index()
+            if known is not None:
+                eval_data = known['eval']
+            else:
+                with self.session.lock:
+                    self.session.set_position(self.fen)
+                    eval_data = self.session.engine.get_evaluation()
             val = eval_data.get('value')
             if eval_data.get('type') == 'mate':
                 text = f"Mate in {val}"
@@ -193,22 +179,18 @@ def open_analysis_window(fen=None):
     if not fen:
         print("Analyzing screen...")
         try:
+            # Imported here so TensorFlow only loads when a screenshot is analyzed
+            from core.inference import BoardClassifier
             classifier = BoardClassifier()
             # Kept your path 'processed/64_squares'
-            predictions = classifier.predict_board("processed/64_squares") 
-            board = chess.Board.empty()
-            for sq, piece in predictions.items():
-                if piece != "zEmpty":
-                    symbol = PIECE_MAP.get(piece)
-                    if symbol:
-                        board.set_piece_at(chess.parse_square(sq.lower()), chess.Piece.from_symbol(symbol))
-            fen = board.fen()
+            fen = classifier.predict_fen("processed/64_squares")
             print(f"Generated FEN: {fen}")
         except Exception as e:
             print(f"Error generating FEN: {e}")
             fen = chess.STARTING_FEN
 
-    engine = get_stockfish_instance()
+    # Reuse one engine across windows so consecutive positions keep its hash table
+    engine = get_engine_session()
     if tk._default_root is None:
         root = tk.Tk()
         root.withdraw()
@@ -1,61 +1,183 @@
 import os
 import cv2
 import numpy as np
-from tensorflow.keras.models import load_model
+from core.backends import load_backend
+from core.decoding import decode_legal_board, is_flipped, rotate_assignment
+from core.grid import split_board_squares
+from core.utils import board_state_to_fen
+from core.vision import crop_chessboards_array
 
 class BoardClassifier:
     def __init__(self, model_path='models/model.h5'):
         self.model_path = model_path
+        # Any backend from core.backends: Keras (.h5/.keras), TFLite or ONNX
         self.model = None
         self.img_size = 100
         self.categories = ["bb", "bk", "bn", "bp", "bq", "br", "wb", "wk", "wn", "wp", "wq", "wr", "zEmpty"]
         # Standard chess files (columns) a-h
         self.files = ["A", "B", "C", "D", "E", "F", "G", "H"]
+        # Square order used for batched predictions: A1, A2, ..., H8
+        self.squares = [f"{f}{r}" for f in self.files for r in range(1, 9)]
 
     def load_model(self):
         """Lazy loads the model only when needed."""
         if self.model is None:
-            print("Loading TensorFlow model... (this may take a moment)")
+            print("Loading model... (this may take a moment)")
+            # The backend imports TensorFlow (or another runtime) only now,
+            # it dominates startup time and is only needed for inference.
             try:
-                self.model = load_model(self.model_path)
+                self.model = load_backend(self.model_path)
             except OSError:
                 print(f"Error: Model not found at {self.model_path}")
                 raise
 
+    def preprocess_array(self, img):
+        """Resizes and normalizes a BGR square image (no batch dimension)."""
+        if img.ndim == 2:
+            img = cv2.cvtColor(img, cv2.COLOR_GRAY2BGR)
+        elif img.shape[2] == 4:
+            img = cv2.cvtColor(img, cv2.COLOR_BGRA2BGR)
+        img_resized = cv2.resize(img, (self.img_size, self.img_size))
+        return img_resized.astype('float32') / 255.0
+
     def preprocess_image(self, image_path):
         """Reads and formats an image for the CNN."""
         img = cv2.imread(image_path, cv2.IMREAD_ANYCOLOR)
         if img is None:
             return None
-        
-        img_resized = cv2.resize(img, (self.img_size, self.img_size))
-        # Normalize pixel values to 0-1
-        img_normalized = img_resized.astype('float32') / 255.0
         # Expand dims to match model input (1, 100, 100, 3)
-        return np.expand_dims(img_normalized, axis=0)
+        return np.expand_dims(self.preprocess_array(img), axis=0)
+
+    def preprocess_board(self, board):
+        """
+        Preprocesses the 64 squares of one board.
+        board: dict { 'A1': BGR array, ... } with all 64 squares.
+        Returns: array of shape (64, 100, 100, 3), squares in self.squares order.
+        Raises ValueError if a square is missing or empty.
+        """
+        squares = []
+        for sq in self.squares:
+            img = board.get(sq)
+            if img is None or img.size == 0:
+                raise ValueError(f"Square {sq} is missing or empty")
+            squares.append(self.preprocess_array(img))
+        return np.stack(squares)
+
+    def predict_preprocessed(self, batch):
+        """
+        Classifies already preprocessed boards in a single model call.
+        batch: array of shape (N, 64, 100, 100, 3).
+        Returns: array of shape (N, 64, 13).
+        """
+        self.load_model()
+        flat = batch.reshape((-1, self.img_size, self.img_size, 3))
+        probabilities = np.asarray(self.model.predict(flat, verbose=0))
+        return probabilities.reshape(len(batch), len(self.squares), len(self.categories))
+
+    def predict_probabilities(self, boards):
+        """
+        Classifies several boards in a single model call.
+        boards: list of dicts { 'A1': BGR array, ... } with all 64 squares.
+        Returns: array of shape (len(boards), 64, 13), squares in self.squares order.
+        """
+        return self.predict_preprocessed(np.stack([self.preprocess_board(board) for board in boards]))
+
+    def decode_probabilities(self, probabilities):
+        """
+        Turns a (64, 13) probability array into the predicted board state
+        and the confidence of each prediction.
+        Returns: ({ 'A1': 'wr', ... }, { 'A1': 0.99, ... })
+        """
+        class_idx = np.argmax(probabilities, axis=1)
+        board_state = {}
+        confidences = {}
+        for i, square_name in enumerate(self.squares):
+            board_state[square_name] = self.categories[class_idx[i]]
+            confidences[square_name] = float(probabilities[i, class_idx[i]])
+        return board_state, confidences
+
+    def decode_legal(self, probabilities, top_k=3):
+        """
+        Like decode_probabilities, but returns the most probable legal
+        placement (see core.decoding), rotated so White is at the bottom.
+        Falls back to the plain argmax if no legal placement is found.
+        Returns: (board_state, confidences, flipped)
+        """
+        assignment, confidences = decode_legal_board(probabilities, self.categories, top_k)
+        if assignment is None:
+            print("Warning: No legal placement found, using raw predictions")
+            class_idx = np.argmax(probabilities, axis=1)
+            assignment = [self.categories[c] for c in class_idx]
+            confidences = [float(probabilities[i, c]) for i, c in enumerate(class_idx)]
+
+        flipped = is_flipped(assignment)
+        if flipped:
+            assignment = rotate_assignment(assignment)
+            confidences = rotate_assignment(confidences)
+        return dict(zip(self.squares, assignment)), dict(zip(self.squares, confidences)), flipped
+
+    def predict_board_probabilities(self, squares_dir):
+        """
+        Iterates through A1..H8 images in the directory and classifies them
+        in a single model call. Unreadable squares are reported as empty.
+        Returns: array of shape (64, 13), squares in self.squares order.
+        """
+        self.load_model()
+        probabilities = np.zeros((len(self.squares), len(self.categories)), dtype='float32')
+        images = []
+        indices = []
+
+        for i, square_name in enumerate(self.squares):
+            img_path = os.path.join(squares_dir, f"{square_name}.png")
+            processed_img = self.preprocess_image(img_path)
+
+            if processed_img is not None:
+                images.append(processed_img[0])
+                indices.append(i)
+            else:
+                print(f"Warning: Could not read image for {square_name}")
+                probabilities[i, self.categories.index("zEmpty")] = 1.0
+
+        if images:
+            probabilities[indices] = self.model.predict(np.stack(images), verbose=0)
+        return probabilities
 
     def predict_board(self, squares_dir):
         """
         Iterates through A1..H8 images in the directory and returns predictions.
         Returns: Dict { 'A1': 'wp', 'A2': 'wp', ... }
         """
-        self.load_model()
-        board_state = {}
+        board_state, _ = self.decode_probabilities(self.predict_board_probabilities(squares_dir))
+        return board_state
+
+    def predict_fen(self, squares_dir):
+        """
+        Returns the FEN of the most probable legal position in the directory,
+        oriented with White at the bottom. A board captured from Black's side
+        gets Black to move, as with core.utils.rotate_board_and_change_side.
+        """
+        board_state, _, flipped = self.decode_legal(self.predict_board_probabilities(squares_dir))
+        return board_state_to_fen(board_state, turn="b" if flipped else "w")
+
+    def predict_boards_in_image(self, image):
+        """
+        Finds every board in a BGR capture and classifies all of them in one
+        batched model call.
+        Returns: list of { 'fen', 'rect', 'board_state', 'confidences', 'flipped' }, largest board first.
+        """
+        crops = crop_chessboards_array(image)
+        if not crops:
+            return []
+        probabilities = self.predict_probabilities([split_board_squares(board) for board, _ in crops])
 
-        for file_char in self.files:
-            for rank_num in range(1, 9): # 1 to 8
-                square_name = f"{file_char}{rank_num}"
-                img_path = os.path.join(squares_dir, f"{square_name}.png")
-
-                processed_img = self.preprocess_image(img_path)
-                
-                if processed_img is not None:
-                    prediction = self.model.predict(processed_img, verbose=0)
-                    class_idx = np.argmax(prediction)
-                    piece_code = self.categories[class_idx]
-                    board_state[square_name] = piece_code
-                else:
-                    print(f"Warning: Could not read image for {square_name}")
-                    board_state[square_name] = "zEmpty"
-
-        return board_state
\ No newline at end of file
+        results = []
+        for (_, rect), board_probabilities in zip(crops, probabilities):
+            board_state, confidences, flipped = self.decode_legal(board_probabilities)
+            results.append({
+                "fen": board_state_to_fen(board_state, turn="b" if flipped else "w"),
+                "rect": rect,
+                "board_state": board_state,
+                "confidences": confidences,
+                "flipped": flipped,
+            })
+        return results
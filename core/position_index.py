@@ -0,0 +1,189 @@
+"""
+Read-only precomputed position index.
+
+Positions from a PGN or FEN corpus are analysed offline and stored in a
+sorted numpy file keyed by the Zobrist hash of their placement and side to
+move. At runtime the file is memory-mapped and looked up with a binary
+search, so known positions (openings, frequently recurring ones) need no
+engine at all.
+
+Build: python -m core.position_index games.pgn --plies 30 --min-count 2 --depth 18
+       python -m core.position_index positions.txt   (one FEN per line)
+"""
+import argparse
+import os
+from collections import Counter
+
+import chess
+import chess.pgn
+import chess.polyglot
+import numpy as np
+
+from core.engine import ENGINE_DEFAULT_DEPTH
+
+DEFAULT_INDEX_PATH = os.path.join("engines", "position_index.npy")
+
+# Evaluations are from White's point of view, as returned by the engine.
+# mate is 0 when there is no forced mate, otherwise moves to mate (signed).
+# move packs from-square | to-square << 6 | promotion piece type << 12.
+# depth is the search depth the record was analysed to, 0 if the search had a
+# node budget instead (its depth is unknown, so it never satisfies a depth).
+RECORD_DTYPE = np.dtype([("key", "<u8"), ("cp", "<i4"), ("mate", "<i2"), ("move", "<u2"), ("depth", "<u1")])
+
+
+def position_hash(board):
+    """
+    Zobrist hash of the placement and side to move only. Recognized boards
+    carry no castling rights or en passant square, so positions from a game
+    record are keyed without them too, or they would never match.
+    """
+    board = board.copy(stack=False)
+    board.castling_rights = chess.BB_EMPTY
+    board.ep_square = None
+    return chess.polyglot.zobrist_hash(board)
+
+
+def encode_move(move):
+    return move.from_square | move.to_square << 6 | (move.promotion or 0) << 12
+
+
+def decode_move(value):
+    value = int(value)
+    promotion = value >> 12
+    return chess.Move(value & 63, (value >> 6) & 63, promotion or None)
+
+
+class PositionIndex:
+    def __init__(self, path=DEFAULT_INDEX_PATH):
+        self.path = path
+        self.records = np.load(path, mmap_mode="r")
+        if self.records.dtype != RECORD_DTYPE:
+            raise ValueError("index was built by an older version, rebuild it")
+        self.keys = self.records["key"]
+
+    def __len__(self):
+        return len(self.records)
+
+    def lookup(self, position, min_depth=0):
+        """
+        position: a FEN string or chess.Board.
+        min_depth: records analysed to a shallower depth are treated as missing.
+        Returns: { 'eval': {'type': 'cp'|'mate', 'value': int}, 'best_move': uci, 'depth': int } or None.
+        """
+        board = chess.Board(position) if isinstance(position, str) else position
+        key = position_hash(board)
+        i = int(np.searchsorted(self.keys, np.uint64(key)))
+        if i >= len(self.keys) or int(self.keys[i]) != key:
+            return None
+        record = self.records[i]
+        if int(record["depth"]) < min_depth:
+            return None
+        if record["mate"]:
+            evaluation = {"type": "mate", "value": int(record["mate"])}
+        else:
+            evaluation = {"type": "cp", "value": int(record["cp"])}
+        move = decode_move(record["move"]) if record["move"] else None
+        return {"eval": evaluation, "best_move": move.uci() if move else None, "depth": int(record["depth"])}
+
+
+_index = None
+_index_loaded = False
+
+
+def get_position_index(path=DEFAULT_INDEX_PATH):
+    """The shared index if one has been built, otherwise None."""
+    global _index, _index_loaded
+    if not _index_loaded:
+        _index_loaded = True
+        if os.path.exists(path):
+            try:
+                _index = PositionIndex(path)
+            except (OSError, ValueError) as e:
+                print(f"Warning: Could not load position index at {path}: {e}")
+    return _index
+
+
+def collect_positions(corpus_path, plies=30, min_count=1):
+    """
+    Reads a PGN (first `plies` half-moves of every game) or a FEN-per-line
+    file and returns the FENs that occur at least `min_count` times.
+    """
+    counts = Counter()
+    fens = {}
+    if corpus_path.lower().endswith(".pgn"):
+        with open(corpus_path) as f:
+            while True:
+                game = chess.pgn.read_game(f)
+                if game is None:
+                    break
+                board = game.board()
+                for ply, move in enumerate(game.mainline_moves()):
+                    if ply >= plies:
+                        break
+                    key = position_hash(board)
+                    counts[key] += 1
+                    fens.setdefault(key, board.fen())
+                    board.push(move)
+    else:
+        with open(corpus_path) as f:
+            for line in f:
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    board = chess.Board(line)
+                except ValueError:
+                    continue
+                key = position_hash(board)
+                counts[key] += 1
+                fens.setdefault(key, board.fen())
+    return [fens[key] for key, count in counts.items() if count >= min_count]
+
+
+def build_index(corpus_path, output_path=DEFAULT_INDEX_PATH, plies=30, min_count=1,
+                engines=None, depth=18, nodes=None):
+    """Analyses the corpus positions across an engine pool and writes the index file."""
+    from core.analysis import analyse_positions
+
+    # The engine stops at its node budget rather than a known depth
+    record_depth = 0 if nodes else depth or ENGINE_DEFAULT_DEPTH
+    fens = collect_positions(corpus_path, plies, min_count)
+    print(f"Analysing {len(fens)} positions...")
+
+    records = []
+    for result in analyse_positions(fens, engines, depth, nodes, multipv=1, use_index=False):
+        if "lines" not in result or not result["lines"]:
+            continue
+        line = result["lines"][0]
+        board = chess.Board(result["fen"])
+        move = chess.Move.from_uci(line["move"]) if line["move"] else None
+        records.append((
+            position_hash(board),
+            line["centipawn"] or 0,
+            line["mate"] or 0,
+            encode_move(move) if move else 0,
+            record_depth,
+        ))
+
+    index = np.array(records, dtype=RECORD_DTYPE)
+    index.sort(order="key")
+    os.makedirs(os.path.dirname(output_path) or ".", exist_ok=True)
+    np.save(output_path, index)
+    print(f"Saved {len(index)} positions to {output_path}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build the precomputed position index")
+    parser.add_argument("corpus", help="PGN file, or a file with one FEN per line")
+    parser.add_argument("-o", "--output", default=DEFAULT_INDEX_PATH)
+    parser.add_argument("--plies", type=int, default=30, help="Half-moves taken from each PGN game")
+    parser.add_argument("--min-count", type=int, default=1, help="Keep positions seen at least this often")
+    parser.add_argument("--engines", type=int, default=os.cpu_count())
+    parser.add_argument("--depth", type=int, default=18)
+    parser.add_argument("--nodes", type=int, default=None)
+    args = parser.parse_args()
+    build_index(args.corpus, args.output, args.plies, args.min_count, args.engines, args.depth, args.nodes)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,273 @@
+"""
+Long-running local recognition service.
+
+Keeps one BoardClassifier and a pool of Stockfish engines warm, and merges
+concurrent requests into shared inference batches.
+
+Run:   python -m core.service --port 8765
+Query: curl --data-binary @board.png -H "Content-Type: image/png" \
+            "http://127.0.0.1:8765/recognize?eval=1"
+"""
+import argparse
+import json
+import queue
+import threading
+import time
+import urllib.error
+import urllib.request
+from concurrent.futures import Future
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+import chess
+import cv2
+import numpy as np
+
+from core.engine import EnginePool
+from core.grid import split_board_squares
+from core.inference import BoardClassifier
+from core.utils import board_state_to_fen
+from core.vision import crop_chessboard_array, crop_chessboards_array
+
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8765
+# Search depth used when a request does not ask for one (the stockfish wrapper's default)
+DEFAULT_DEPTH = 15
+
+
+class InferenceBatcher:
+    """
+    Collects boards from many threads and classifies them together.
+
+    A batch is sent to the model as soon as it holds `max_batch` boards or
+    the oldest board has waited `max_wait` seconds, whichever comes first.
+    """
+
+    def __init__(self, classifier, max_batch=16, max_wait=0.01):
+        self.classifier = classifier
+        self.max_batch = max_batch
+        self.max_wait = max_wait
+        self.requests = queue.Queue()
+        self.thread = threading.Thread(target=self._run, daemon=True)
+        self.thread.start()
+
+    def submit(self, squares):
+        """
+        Queues a { 'A1': array, ... } board. Returns a Future of its (64, 13) probabilities.
+
+        Preprocessing runs here, on the caller's thread, so a malformed board
+        raises ValueError for its own request instead of failing the whole batch.
+        """
+        try:
+            board = self.classifier.preprocess_board(squares)
+        except cv2.error as e:
+            raise ValueError(f"Could not preprocess board: {e}") from e
+        future = Future()
+        self.requests.put((board, future))
+        return future
+
+    def _collect_batch(self):
+        batch = [self.requests.get()]
+        deadline = time.monotonic() + self.max_wait
+        while len(batch) < self.max_batch:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self.requests.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self):
+        while True:
+            batch = self._collect_batch()
+            try:
+                probabilities = self.classifier.predict_preprocessed(np.stack([board for board, _ in batch]))
+            except Exception as e:
+                for _, future in batch:
+                    future.set_exception(e)
+                continue
+            for (_, future), board_probabilities in zip(batch, probabilities):
+                future.set_result(board_probabilities)
+
+
+class RecognitionService:
+    def __init__(self, model_path='models/model.h5', engines=2, max_batch=16, max_wait=0.01,
+                 default_depth=DEFAULT_DEPTH):
+        self.default_depth = default_depth
+        self.classifier = BoardClassifier(model_path)
+        # Load the model up front so the first request does not pay for it
+        self.classifier.load_model()
+        self.batcher = InferenceBatcher(self.classifier, max_batch, max_wait)
+        self.engine_pool = EnginePool(engines) if engines > 0 else None
+
+    def recognize(self, image, detect_board=True, with_eval=False, depth=None):
+        """
+        image: BGR numpy array of a screen capture (or of a cropped board
+        when detect_board is False).
+        """
+        rect = None
+        if detect_board:
+            image, rect = crop_chessboard_array(image)
+            if image is None:
+                return {"error": "Chessboard not found in the image."}
+        if min(image.shape[:2]) < 8:
+            raise ValueError(f"Board image is too small ({image.shape[1]}x{image.shape[0]})")
+
+        probabilities = self.batcher.submit(split_board_squares(image)).result()
+        board_state, confidences, flipped = self.classifier.decode_legal(probabilities)
+        fen = board_state_to_fen(board_state, turn="b" if flipped else "w")
+
+        result = {"fen": fen, "confidences": confidences, "rect": rect, "flipped": flipped}
+        if with_eval:
+            result["eval"] = self.evaluate(fen, depth)
+        return result
+
+    def recognize_all(self, image, with_eval=False, depth=None):
+        """Recognizes every board in a capture. All of them go into the same inference batch."""
+        crops = crop_chessboards_array(image)
+        futures = [self.batcher.submit(split_board_squares(board)) for board, _ in crops]
+
+        boards = []
+        for (_, rect), future in zip(crops, futures):
+            board_state, confidences, flipped = self.classifier.decode_legal(future.result())
+            fen = board_state_to_fen(board_state, turn="b" if flipped else "w")
+            board = {"fen": fen, "confidences": confidences, "rect": rect, "flipped": flipped}
+            if with_eval:
+                board["eval"] = self.evaluate(fen, depth)
+            boards.append(board)
+        return {"boards": boards}
+
+    def evaluate(self, fen, depth=None):
+        if self.engine_pool is None or self.engine_pool.available == 0:
+            return {"error": "Stockfish not available"}
+        if not chess.Board(fen).is_valid():
+            return {"error": "Recognized position is not legal"}
+        with self.engine_pool.acquire() as engine:
+            # Engines are shared, so set the depth on every call rather than
+            # leaving one request's depth behind for the next
+            engine.set_depth(depth or self.default_depth)
+            engine.set_fen_position(fen)
+            evaluation = engine.get_evaluation()
+            evaluation["best_move"] = engine.get_best_move()
+            return evaluation
+
+
+def decode_request_image(body, headers):
+    """
+    Accepts either an encoded image (PNG/JPEG/...) or a raw capture buffer.
+    Raw buffers need X-Width and X-Height headers; X-Format is BGRA (mss) or BGR.
+    """
+    if headers.get("X-Width") and headers.get("X-Height"):
+        width, height = int(headers["X-Width"]), int(headers["X-Height"])
+        pixel_format = headers.get("X-Format", "BGRA").upper()
+        channels = 4 if pixel_format == "BGRA" else 3
+        image = np.frombuffer(body, dtype=np.uint8).reshape(height, width, channels)
+        return cv2.cvtColor(image, cv2.COLOR_BGRA2BGR) if channels == 4 else image
+    return cv2.imdecode(np.frombuffer(body, dtype=np.uint8), cv2.IMREAD_COLOR)
+
+
+def make_handler(service):
+    class RecognitionHandler(BaseHTTPRequestHandler):
+        def _send_json(self, status, payload):
+            data = json.dumps(payload).encode()
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def do_GET(self):
+            if urlparse(self.path).path == "/health":
+                self._send_json(200, {"status": "ok"})
+            else:
+                self._send_json(404, {"error": "Not found"})
+
+        def do_POST(self):
+            url = urlparse(self.path)
+            if url.path != "/recognize":
+                self._send_json(404, {"error": "Not found"})
+                return
+            params = parse_qs(url.query)
+            body = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+            try:
+                image = decode_request_image(body, self.headers)
+            except (ValueError, cv2.error) as e:
+                self._send_json(400, {"error": f"Bad image buffer: {e}"})
+                return
+            if image is None:
+                self._send_json(400, {"error": "Could not decode image"})
+                return
+
+            with_eval = params.get("eval", ["0"])[0] == "1"
+            depth = None
+            if "depth" in params:
+                try:
+                    depth = int(params["depth"][0])
+                except ValueError:
+                    depth = 0
+                if not 1 <= depth <= 100:
+                    self._send_json(400, {"error": "depth must be an integer between 1 and 100"})
+                    return
+
+            try:
+                if params.get("multi", ["0"])[0] == "1":
+                    result = service.recognize_all(image, with_eval, depth)
+                else:
+                    result = service.recognize(
+                        image,
+                        detect_board=params.get("board", ["0"])[0] != "1",
+                        with_eval=with_eval,
+                        depth=depth,
+                    )
+            except ValueError as e:
+                self._send_json(400, {"error": str(e)})
+                return
+            except Exception as e:
+                print(f"Error handling request: {e}")
+                self._send_json(500, {"error": "Internal error"})
+                return
+            self._send_json(422 if "error" in result else 200, result)
+
+        def log_message(self, format, *args):
+            pass
+
+    return RecognitionHandler
+
+
+def recognize_remote(image_bytes, host=DEFAULT_HOST, port=DEFAULT_PORT, with_eval=False, timeout=30):
+    """Client helper: sends an encoded image to a running service and returns its JSON reply."""
+    url = f"http://{host}:{port}/recognize?eval={1 if with_eval else 0}"
+    request = urllib.request.Request(url, data=image_bytes, headers={"Content-Type": "application/octet-stream"})
+    try:
+        with urllib.request.urlopen(request, timeout=timeout) as response:
+            return json.loads(response.read())
+    except urllib.error.HTTPError as e:
+        return json.loads(e.read())
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Chess Vision local recognition service")
+    parser.add_argument("--host", default=DEFAULT_HOST)
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    parser.add_argument("--model", default="models/model.h5")
+    parser.add_argument("--engines", type=int, default=2, help="Number of warm Stockfish processes")
+    parser.add_argument("--max-batch", type=int, default=16, help="Max boards per inference batch")
+    parser.add_argument("--max-wait-ms", type=float, default=10, help="Max time a board waits for a batch")
+    parser.add_argument("--depth", type=int, default=DEFAULT_DEPTH, help="Search depth when a request gives none")
+    args = parser.parse_args()
+
+    service = RecognitionService(args.model, args.engines, args.max_batch, args.max_wait_ms / 1000.0, args.depth)
+    server = ThreadingHTTPServer((args.host, args.port), make_handler(service))
+    print(f"Recognition service listening on http://{args.host}:{args.port}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
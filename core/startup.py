@@ -0,0 +1,84 @@
+import importlib
+import subprocess
+import sys
+import threading
+
+# Modules that are expensive to import and are only needed once the user
+# actually asks for a screenshot or an analysis.
+HEAVY_MODULES = [
+    "numpy",
+    "cv2",
+    "PIL.Image",
+    "mss",
+    "chess",
+    "stockfish",
+    "tensorflow",
+    "core.vision",
+    "core.capture",
+    "core.grid",
+    "core.inference",
+    "core.gui_analysis",
+]
+
+_preload_thread = None
+
+
+def _preload(modules):
+    for name in modules:
+        try:
+            importlib.import_module(name)
+        except Exception as e:
+            print(f"Warning: background import of {name} failed: {e}")
+
+
+def preload_in_background(modules=None):
+    """Imports heavy modules on a daemon thread so the first click is fast."""
+    global _preload_thread
+    if _preload_thread is None:
+        _preload_thread = threading.Thread(
+            target=_preload, args=(modules or HEAVY_MODULES,), daemon=True
+        )
+        _preload_thread.start()
+    return _preload_thread
+
+
+def wait_for_preload(timeout=None):
+    """Blocks until the background preload (if any) has finished."""
+    if _preload_thread is not None:
+        _preload_thread.join(timeout)
+
+
+def measure_import_cost(module_name):
+    """
+    Imports a module in a fresh interpreter and returns the cold import
+    time in seconds, or None if the import failed.
+    """
+    code = (
+        "import importlib, time\n"
+        "t = time.perf_counter()\n"
+        f"importlib.import_module({module_name!r})\n"
+        "print(time.perf_counter() - t)\n"
+    )
+    result = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True)
+    if result.returncode != 0:
+        return None
+    try:
+        return float(result.stdout.strip().splitlines()[-1])
+    except (ValueError, IndexError):
+        return None
+
+
+def print_startup_report(modules=None):
+    """Prints the cold import cost of each module, slowest first."""
+    modules = modules or HEAVY_MODULES
+    costs = [(name, measure_import_cost(name)) for name in modules]
+    ui_cost = measure_import_cost("tkinter")
+
+    print(f"{'Module':<22}{'Cold import (ms)':>18}")
+    print("-" * 40)
+    for name, cost in sorted(costs, key=lambda c: -(c[1] or 0)):
+        text = "failed" if cost is None else f"{cost * 1000:.1f}"
+        print(f"{name:<22}{text:>18}")
+    print("-" * 40)
+    text = "failed" if ui_cost is None else f"{ui_cost * 1000:.1f}"
+    print(f"{'tkinter (UI)':<22}{text:>18}")
@@ -1,3 +1,6 @@
+import chess
+
+
 def rotate_board_and_change_side(fen):
     def flip_case(c):
         return c.lower() if c.isupper() else c.upper()
@@ -12,4 +15,20 @@ def rotate_board_and_change_side(fen):
 
     # Update the FEN
     new_fen = f"{rotated_board} {side_to_move} {fen_parts[2]} {fen_parts[3]} {fen_parts[4]} {fen_parts[5]}"
-    return new_fen
\ No newline at end of file
+    return new_fen
+
+PIECE_MAP = {
+    "bb": "b", "bk": "k", "bn": "n", "bp": "p", "bq": "q", "br": "r",
+    "wb": "B", "wk": "K", "wn": "N", "wp": "P", "wq": "Q", "wr": "R",
+}
+
+
+def board_state_to_fen(board_state, turn="w"):
+    """Builds a FEN from a { 'A1': 'wp', ... } prediction dict."""
+    board = chess.Board.empty()
+    for sq, piece in board_state.items():
+        symbol = PIECE_MAP.get(piece)
+        if symbol:
+            board.set_piece_at(chess.parse_square(sq.lower()), chess.Piece.from_symbol(symbol))
+    board.turn = chess.WHITE if turn == "w" else chess.BLACK
+    return board.fen()
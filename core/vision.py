@@ -1,63 +1,233 @@
-import cv2
-import numpy as np
-import os
-
-def line_intersection(line1, line2):
-    x1, y1, x2, y2 = line1
-    x3, y3, x4, y4 = line2
-    det = (x1 - x2) * (y3 - y4) - (y1 - y2) * (x3 - x4)
-    if det != 0:
-        px = ((x1 * y2 - y1 * x2) * (x3 - x4) - (x1 - x2) * (x3 * y4 - y3 * x4)) / det
-        py = ((x1 * y2 - y1 * x2) * (y3 - y4) - (y1 - y2) * (x3 * y4 - y3 * x4)) / det
-        return px, py
-    else:
-        return None
-
-def find_chessboard(image, canny_low=50, canny_high=150):
-    gray_image = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
-    blurred = cv2.GaussianBlur(gray_image, (5, 5), 0)
-    edges = cv2.Canny(blurred, canny_low, canny_high)
-    contours, _ = cv2.findContours(edges, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
-
-    largest_area = 0
-    chessboard_contour = None
-
-    for contour in contours:
-        area = cv2.contourArea(contour)
-        if area > largest_area:
-            x, y, w, h = cv2.boundingRect(contour)
-            aspect_ratio = float(w) / h
-
-            if 0.8 <= aspect_ratio <= 1.2:
-                largest_area = area
-                chessboard_contour = contour
-
-    if chessboard_contour is not None:
-        x, y, w, h = cv2.boundingRect(chessboard_contour)
-        return x, y, x + w, y + h
-
-    return None
-
-def crop_chessboard(image, padding=3):
-    cv2_img = np.array(image)
-    chessboard_coordinates = find_chessboard(cv2_img)
-
-    if chessboard_coordinates is not None:
-        x1, y1, x2, y2 = chessboard_coordinates
-
-        x1 = max(x1 - padding, 0)
-        y1 = max(y1 - padding, 0)
-        x2 = min(x2 + padding, cv2_img.shape[1])
-        y2 = min(y2 + padding, cv2_img.shape[0])
-
-        cropped_img = image.crop((x1, y1, x2, y2))
-        
-        # Create processed directory if it doesn't exist
-        os.makedirs('processed', exist_ok=True)
-        output_path = os.path.join('processed', 'cropped_chessboard.png')
-        cropped_img.save(output_path)
-
-        return cropped_img
-    else:
-        print("Chessboard not found in the image.")
-        return None
+import cv2
+import numpy as np
+import os
+
+def line_intersection(line1, line2):
+    x1, y1, x2, y2 = line1
+    x3, y3, x4, y4 = line2
+    det = (x1 - x2) * (y3 - y4) - (y1 - y2) * (x3 - x4)
+    if det != 0:
+        px = ((x1 * y2 - y1 * x2) * (x3 - x4) - (x1 - x2) * (x3 * y4 - y3 * x4)) / det
+        py = ((x1 * y2 - y1 * x2) * (y3 - y4) - (y1 - y2) * (x3 * y4 - y3 * x4)) / det
+        return px, py
+    else:
+        return None
+
+def find_chessboard(image, canny_low=50, canny_high=150):
+    gray_image = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
+    blurred = cv2.GaussianBlur(gray_image, (5, 5), 0)
+    edges = cv2.Canny(blurred, canny_low, canny_high)
+    contours, _ = cv2.findContours(edges, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+
+    largest_area = 0
+    chessboard_contour = None
+
+    for contour in contours:
+        area = cv2.contourArea(contour)
+        if area > largest_area:
+            x, y, w, h = cv2.boundingRect(contour)
+            aspect_ratio = float(w) / h
+
+            if 0.8 <= aspect_ratio <= 1.2:
+                largest_area = area
+                chessboard_contour = contour
+
+    if chessboard_contour is not None:
+        x, y, w, h = cv2.boundingRect(chessboard_contour)
+        return x, y, x + w, y + h
+
+    return None
+
+def rect_overlap(rect_a, rect_b):
+    """Fraction of the smaller rectangle covered by the intersection of the two."""
+    ax1, ay1, ax2, ay2 = rect_a
+    bx1, by1, bx2, by2 = rect_b
+    iw = min(ax2, bx2) - max(ax1, bx1)
+    ih = min(ay2, by2) - max(ay1, by1)
+    if iw <= 0 or ih <= 0:
+        return 0.0
+    smaller = min((ax2 - ax1) * (ay2 - ay1), (bx2 - bx1) * (by2 - by1))
+    return (iw * ih) / smaller if smaller else 0.0
+
+def board_grid_score(gray_image, rect, min_contrast=12):
+    """
+    How well a rectangle holds an 8x8 checkerboard: the fraction of its cells
+    whose corners (where pieces rarely reach) have the expected shade of an
+    alternating pattern, or 0.0 when there are not two distinct shades.
+    """
+    x1, y1, x2, y2 = rect
+    cell_w, cell_h = (x2 - x1) / 8.0, (y2 - y1) / 8.0
+    inset_x, inset_y = max(1, int(cell_w * 0.15)), max(1, int(cell_h * 0.15))
+    shades = np.zeros((8, 8))
+    for i in range(8):
+        for j in range(8):
+            cx1, cy1 = int(x1 + j * cell_w), int(y1 + i * cell_h)
+            cx2, cy2 = int(x1 + (j + 1) * cell_w), int(y1 + (i + 1) * cell_h)
+            corners = [
+                gray_image[cy1:cy1 + inset_y, cx1:cx1 + inset_x],
+                gray_image[cy1:cy1 + inset_y, cx2 - inset_x:cx2],
+                gray_image[cy2 - inset_y:cy2, cx1:cx1 + inset_x],
+                gray_image[cy2 - inset_y:cy2, cx2 - inset_x:cx2],
+            ]
+            shades[i, j] = np.median(np.concatenate([c.ravel() for c in corners]))
+
+    even = (np.add.outer(np.arange(8), np.arange(8)) % 2) == 0
+    even_shade, odd_shade = np.median(shades[even]), np.median(shades[~even])
+    if abs(even_shade - odd_shade) < min_contrast:
+        return 0.0
+    threshold = (even_shade + odd_shade) / 2
+    return float(np.mean(np.where(even, shades > threshold, shades <= threshold) == (even_shade > threshold)))
+
+def has_board_grid(gray_image, rect, min_contrast=12, min_agreement=0.85):
+    """
+    Checks that a rectangle holds an 8x8 checkerboard. A single board cell
+    or a plain panel has no such pattern.
+    """
+    return board_grid_score(gray_image, rect, min_contrast) >= min_agreement
+
+def cell_grid_candidates(gray_image, cells, min_cells=16):
+    """
+    Board rectangles rebuilt from the board's own cells, for boards whose
+    outline has merged with a touching eval bar, name box or side panel.
+
+    `cells` are (x, y, w, h) boxes of small square contours. Cells of about
+    the same size that touch each other are grouped; the group's spacing
+    gives the cell pitch, and of the 8x8 grids aligned to it that cover the
+    group, the one with the clearest checkerboard is returned.
+    """
+    if len(cells) < min_cells:
+        return []
+    cells = np.array(sorted(set(cells)), dtype=np.float64)
+    centers = cells[:, :2] + cells[:, 2:] / 2
+    sizes = cells[:, 2:].mean(axis=1)
+
+    def neighbours(i):
+        close = (np.abs(centers - centers[i]) <= 1.6 * sizes[i]).all(axis=1)
+        return np.nonzero(close & (np.abs(sizes - sizes[i]) <= 0.2 * sizes[i]))[0]
+
+    height, width = gray_image.shape[:2]
+    candidates = []
+    unvisited = set(range(len(cells)))
+    while unvisited:
+        group = [unvisited.pop()]
+        for i in group:
+            for j in neighbours(i):
+                if j in unvisited:
+                    unvisited.remove(j)
+                    group.append(j)
+        if len(group) < min_cells:
+            continue
+
+        pitch_estimate = np.median(sizes[group])
+        pitches, origins, spans = [], [], []
+        for axis in (0, 1):
+            low, high = centers[group, axis].min(), centers[group, axis].max()
+            count = int(round((high - low) / pitch_estimate)) + 1
+            if count > 8:
+                break
+            pitches.append((high - low) / (count - 1) if count > 1 else pitch_estimate)
+            origins.append(low)
+            spans.append(count)
+        if len(pitches) < 2:
+            continue
+
+        best, best_score = None, 0.0
+        for shift_x in range(9 - spans[0]):
+            for shift_y in range(9 - spans[1]):
+                x1 = int(round(origins[0] - (shift_x + 0.5) * pitches[0]))
+                y1 = int(round(origins[1] - (shift_y + 0.5) * pitches[1]))
+                rect = (x1, y1, int(round(x1 + 8 * pitches[0])), int(round(y1 + 8 * pitches[1])))
+                if rect[0] < 0 or rect[1] < 0 or rect[2] > width or rect[3] > height:
+                    continue
+                score = board_grid_score(gray_image, rect)
+                if score > best_score:
+                    best, best_score = rect, score
+        if best is not None:
+            candidates.append(best)
+    return candidates
+
+def find_chessboards(image, canny_low=50, canny_high=150, min_size=80, max_overlap=0.3):
+    """
+    Like find_chessboard, but returns every board in the image, largest
+    first, as a list of (x1, y1, x2, y2). Only square-ish regions that
+    contain an 8x8 checkerboard are kept, and regions overlapping a larger
+    board are dropped.
+    """
+    gray_image = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
+    blurred = cv2.GaussianBlur(gray_image, (5, 5), 0)
+    edges = cv2.Canny(blurred, canny_low, canny_high)
+    # Close small gaps so a board's outline comes out as one contour instead
+    # of being split into its cells at every grid line
+    dilated = cv2.dilate(edges, np.ones((3, 3), np.uint8))
+    contours, _ = cv2.findContours(dilated, cv2.RETR_LIST, cv2.CHAIN_APPROX_SIMPLE)
+
+    candidates = set()
+    for contour in contours:
+        x, y, w, h = cv2.boundingRect(contour)
+        if w < min_size or h < min_size:
+            continue
+        if 0.8 <= float(w) / h <= 1.2:
+            candidates.add((x, y, x + w, y + h))
+
+    # The outline merges with anything touching the board, so also rebuild
+    # boards from their cells, which the undilated edges keep apart
+    contours, _ = cv2.findContours(edges, cv2.RETR_LIST, cv2.CHAIN_APPROX_SIMPLE)
+    cells = []
+    for contour in contours:
+        x, y, w, h = cv2.boundingRect(contour)
+        if w >= min_size / 8 and h >= min_size / 8 and 0.8 <= float(w) / h <= 1.2:
+            cells.append((x, y, w, h))
+    candidates.update(cell_grid_candidates(gray_image, cells))
+
+    boards = []
+    # Largest bounding box first: Canny contours are often open, so their
+    # contourArea says little about the size of the region they outline
+    for rect in sorted(candidates, key=lambda r: -(r[2] - r[0]) * (r[3] - r[1])):
+        if any(rect_overlap(rect, kept) > max_overlap for kept in boards):
+            continue
+        if has_board_grid(gray_image, rect):
+            boards.append(rect)
+    return boards
+
+def crop_chessboards_array(cv2_img, padding=3, **kwargs):
+    """In-memory crops of every board in the image: list of (cropped array, rect)."""
+    crops = []
+    for coordinates in find_chessboards(cv2_img, **kwargs):
+        x1, y1, x2, y2 = padded_board_rect(coordinates, cv2_img.shape, padding)
+        crops.append((cv2_img[y1:y2, x1:x2], (x1, y1, x2, y2)))
+    return crops
+
+def padded_board_rect(coordinates, shape, padding=3):
+    x1, y1, x2, y2 = coordinates
+    x1 = max(x1 - padding, 0)
+    y1 = max(y1 - padding, 0)
+    x2 = min(x2 + padding, shape[1])
+    y2 = min(y2 + padding, shape[0])
+    return x1, y1, x2, y2
+
+def crop_chessboard_array(cv2_img, padding=3):
+    """In-memory variant of crop_chessboard: returns (cropped array, rect) or (None, None)."""
+    chessboard_coordinates = find_chessboard(cv2_img)
+    if chessboard_coordinates is None:
+        return None, None
+    x1, y1, x2, y2 = padded_board_rect(chessboard_coordinates, cv2_img.shape, padding)
+    return cv2_img[y1:y2, x1:x2], (x1, y1, x2, y2)
+
+def crop_chessboard(image, padding=3):
+    cv2_img = np.array(image)
+    chessboard_coordinates = find_chessboard(cv2_img)
+
+    if chessboard_coordinates is not None:
+        x1, y1, x2, y2 = padded_board_rect(chessboard_coordinates, cv2_img.shape, padding)
+
+        cropped_img = image.crop((x1, y1, x2, y2))
+        
+        # Create processed directory if it doesn't exist
+        os.makedirs('processed', exist_ok=True)
+        output_path = os.path.join('processed', 'cropped_chessboard.png')
+        cropped_img.save(output_path)
+
+        return cropped_img
+    else:
+        print("Chessboard not found in the image.")
+        return None
@@ -1,11 +1,9 @@
 import subprocess
+import sys
 import tkinter as tk
 import chess
 from tkinter import ttk
-from core.vision import crop_chessboard
-from core.capture import grab_screen
-from core.grid import square_maker
-from core.gui_analysis import open_analysis_window
+from core.startup import preload_in_background, print_startup_report
 
 COLORS = {
     'bg': '#2b2b2b',
@@ -23,7 +21,14 @@ COLORS = {
 def screenshot_button_click(error_label, root_window):
     error_label.config(text="Processing...", fg=COLORS['button_bg'])
     root_window.update()
-    
+
+    # Heavy modules (OpenCV, TensorFlow, Stockfish) are imported on first use
+    # so the main window shows up without waiting on them.
+    from core.capture import grab_screen
+    from core.vision import crop_chessboard
+    from core.grid import square_maker
+    from core.gui_analysis import open_analysis_window
+
     img = grab_screen()
     if img is None:
         error_label.config(text="No browser found!", fg=COLORS['error'])
@@ -51,7 +56,9 @@ def fen_button_click(fen, fen_error_label, fen_entry, root_window):
     if not fen.strip():
         fen_error_label.config(text="Please enter a FEN string", fg=COLORS['error'])
         return False
-    
+
+    from core.gui_analysis import open_analysis_window
+
     board = chess.Board()
     try:
         board.set_fen(fen)
@@ -190,8 +197,13 @@ def run_mainloop():
     )
     fen_error_label.pack(pady=(5, 0))
 
+    # Warm up the heavy imports while the user is looking at the window
+    root.after(0, preload_in_background)
     root.mainloop()
 
 
 if __name__ == "__main__":
-    run_mainloop()
+    if "--startup-report" in sys.argv:
+        print_startup_report()
+    else:
+        run_mainloop()
@@ -0,0 +1,93 @@
+import argparse
+import os
+import shutil
+from concurrent.futures import ThreadPoolExecutor
+
+import cv2
+import numpy as np
+
+DATADIR = "assets/dataset"
+DUPLICATES_DIR = "assets/duplicates"
+CATEGORIES = ["bb", "bk", "bn", "bp", "bq", "br", "wb", "wk", "wn", "wp", "wq", "wr", "zEmpty"]
+
+
+def perceptual_hash(img_path):
+    """64-bit DCT perceptual hash of an image, or None if it cannot be read."""
+    img = cv2.imread(img_path, cv2.IMREAD_GRAYSCALE)
+    if img is None:
+        return None
+    small = cv2.resize(img, (32, 32), interpolation=cv2.INTER_AREA).astype('float32')
+    low_freq = cv2.dct(small)[:8, :8].flatten()
+    # Compare against the median of the AC terms (skip the DC term)
+    bits = low_freq > np.median(low_freq[1:])
+    return int("".join("1" if b else "0" for b in bits), 2)
+
+
+def hash_dataset(datadir=DATADIR, workers=None):
+    """
+    Hashes every image in parallel. Threads rather than processes: OpenCV
+    releases the GIL while decoding and resizing, and a process pool would
+    re-import the caller (e.g. train_model.py and TensorFlow) in every
+    worker on spawn-based platforms.
+    Returns: Dict { category: [(file_name, hash), ...] }
+    """
+    paths = []
+    for category in CATEGORIES:
+        for img in sorted(os.listdir(os.path.join(datadir, category))):
+            paths.append((category, img))
+
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        hashes = list(executor.map(perceptual_hash, [os.path.join(datadir, c, img) for c, img in paths]))
+
+    hashed = {category: [] for category in CATEGORIES}
+    for (category, img), img_hash in zip(paths, hashes):
+        if img_hash is None:
+            print(f"Error reading image: {os.path.join(datadir, category, img)}")
+        else:
+            hashed[category].append((img, img_hash))
+    return hashed
+
+
+def find_duplicates(datadir=DATADIR, max_distance=4, workers=None):
+    """
+    Groups near-identical images within each category (Hamming distance of
+    their perceptual hashes <= max_distance). The first file of each group,
+    by name, is kept.
+    Returns: Dict { category: [duplicate file names] }
+    """
+    duplicates = {}
+    for category, items in hash_dataset(datadir, workers).items():
+        kept = []
+        duplicates[category] = []
+        for img, img_hash in items:
+            if any(bin(img_hash ^ kept_hash).count("1") <= max_distance for kept_hash in kept):
+                duplicates[category].append(img)
+            else:
+                kept.append(img_hash)
+    return duplicates
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Find near-duplicate images in the training dataset")
+    parser.add_argument("--datadir", default=DATADIR)
+    parser.add_argument("--max-distance", type=int, default=4, help="Max Hamming distance between hashes")
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--apply", action="store_true",
+                        help=f"Move duplicates to {DUPLICATES_DIR} (default: only report them)")
+    args = parser.parse_args()
+
+    duplicates = find_duplicates(args.datadir, args.max_distance, args.workers)
+    total = 0
+    for category, files in duplicates.items():
+        total += len(files)
+        for img in files:
+            print(f"{category}/{img}")
+            if args.apply:
+                os.makedirs(os.path.join(DUPLICATES_DIR, category), exist_ok=True)
+                shutil.move(os.path.join(args.datadir, category, img), os.path.join(DUPLICATES_DIR, category, img))
+    action = "Moved" if args.apply else "Found"
+    print(f"{action} {total} near-duplicate images")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,3 +1,5 @@
+import argparse
+import json
 import numpy as np
 import matplotlib.pyplot as plt
 import os
@@ -13,14 +15,17 @@ from tensorflow.keras.callbacks import EarlyStopping
 DATADIR = "assets/dataset"
 CATEGORIES = ["bb", "bk", "bn", "bp", "bq", "br", "wb", "wk", "wn", "wp", "wq", "wr", "zEmpty"]
 
-X = []
-Y = []
-
-def create_training_data():
+def create_training_data(skip=None):
+    X = []
+    Y = []
+    paths = []
+    skip = skip or {}
     for category in CATEGORIES:
         path = os.path.join(DATADIR, category)
         class_num = CATEGORIES.index(category)
         for img in os.listdir(path):
+            if img in skip.get(category, ()):
+                continue
             img_path = os.path.join(path, img)
             img_array = cv2.imread(img_path, cv2.IMREAD_ANYCOLOR)
             if img_array is not None:
@@ -30,23 +35,10 @@ def create_training_data():
                     resized_array = cv2.cvtColor(resized_array, cv2.COLOR_GRAY2BGR)
                 X.append(resized_array)
                 Y.append(class_num)
+                paths.append(img_path)
             else:
                 print(f"Error reading image: {img_path}")
-
-create_training_data()
-X = np.stack(X)
-Y = np.array(Y)
-
-XY = list(zip(X, Y))
-random.shuffle(XY)
-X, Y = zip(*XY)
-
-IMG_SIZE = 100
-X = np.array(X).reshape(-1, IMG_SIZE, IMG_SIZE, 3)
-X = X.astype('float32') / 255.0
-Y = to_categorical(Y)
-
-X_train, X_test, Y_train, Y_test = train_test_split(X, Y, test_size=0.2, random_state=70)
+    return X, Y, paths
 
 def create_model_with_dropout():
     model = models.Sequential()
@@ -61,30 +53,104 @@ def create_model_with_dropout():
     model.add(layers.Dense(len(CATEGORIES), activation='softmax'))
     return model
 
-model_with_dropout = create_model_with_dropout()
-
-model_with_dropout.compile(optimizer='adam',
-              loss='categorical_crossentropy',
-              metrics=['accuracy'])
-
-# Data augmentation
-datagen = ImageDataGenerator(
-    rotation_range=10,
-    width_shift_range=0.1,
-    height_shift_range=0.1,
-    horizontal_flip=False)
-
-datagen.fit(X_train)
-
-# Add the EarlyStopping callback
-early_stopping = EarlyStopping(monitor='val_loss', patience=8, mode='min')
-
-history_with_dropout = model_with_dropout.fit(datagen.flow(X_train, Y_train, batch_size=32),
-                    steps_per_epoch=len(X_train) / 32, epochs=64,
-                    validation_data=(X_test, Y_test),
-                    callbacks=[early_stopping])
-
-
-test_loss_dropout, test_acc_dropout = model_with_dropout.evaluate(X_test, Y_test, verbose=2)
-print('\nTest accuracy with dropout and data augmentation:', test_acc_dropout)
-model_with_dropout.save(f"models/model_{test_acc_dropout}.h5")
+def select_hard_examples(model, X_all, Y_all, easy_fraction):
+    """Indices of misclassified examples plus a random sample of the correct ones."""
+    predicted = np.argmax(model.predict(X_all, batch_size=256, verbose=0), axis=1)
+    wrong = predicted != np.argmax(Y_all, axis=1)
+    hard = np.flatnonzero(wrong)
+    easy = np.flatnonzero(~wrong)
+    sampled = np.random.choice(easy, size=int(len(easy) * easy_fraction), replace=False)
+    return np.concatenate([hard, sampled])
+
+def main():
+    parser = argparse.ArgumentParser(description="Train the piece classifier")
+    parser.add_argument("--dedupe", action="store_true",
+                        help="Skip near-duplicate images (see scripts/dedupe_dataset.py)")
+    parser.add_argument("--hard-mining", action="store_true",
+                        help="Each epoch, train on the examples the model gets wrong plus a sample of the rest")
+    parser.add_argument("--easy-fraction", type=float, default=0.25,
+                        help="Fraction of correctly classified examples kept per epoch with --hard-mining")
+    args = parser.parse_args()
+
+    duplicates = {}
+    if args.dedupe:
+        from dedupe_dataset import find_duplicates
+        duplicates = {category: set(files) for category, files in find_duplicates(DATADIR).items()}
+        print(f"Skipping {sum(len(files) for files in duplicates.values())} near-duplicate images")
+
+    X, Y, paths = create_training_data(duplicates)
+    X = np.stack(X)
+    Y = np.array(Y)
+
+    XY = list(zip(X, Y, paths))
+    random.shuffle(XY)
+    X, Y, paths = zip(*XY)
+
+    IMG_SIZE = 100
+    X = np.array(X).reshape(-1, IMG_SIZE, IMG_SIZE, 3)
+    X = X.astype('float32') / 255.0
+    Y = to_categorical(Y)
+
+    X_train, X_test, Y_train, Y_test, _, paths_test = train_test_split(X, Y, list(paths), test_size=0.2, random_state=70)
+
+    model_with_dropout = create_model_with_dropout()
+
+    model_with_dropout.compile(optimizer='adam',
+                  loss='categorical_crossentropy',
+                  metrics=['accuracy'])
+
+    # Data augmentation
+    datagen = ImageDataGenerator(
+        rotation_range=10,
+        width_shift_range=0.1,
+        height_shift_range=0.1,
+        horizontal_flip=False)
+
+    datagen.fit(X_train)
+
+    # Add the EarlyStopping callback
+    early_stopping = EarlyStopping(monitor='val_loss', patience=8, mode='min')
+
+    if args.hard_mining:
+        # One full epoch first so the model has an opinion on every example
+        history_with_dropout = model_with_dropout.fit(datagen.flow(X_train, Y_train, batch_size=32),
+                            steps_per_epoch=len(X_train) / 32, epochs=1,
+                            validation_data=(X_test, Y_test))
+        best_val_loss = min(history_with_dropout.history['val_loss'])
+        epochs_without_improvement = 0
+        for epoch in range(1, 64):
+            indices = select_hard_examples(model_with_dropout, X_train, Y_train, args.easy_fraction)
+            print(f"Epoch {epoch + 1}: training on {len(indices)}/{len(X_train)} examples")
+            history = model_with_dropout.fit(datagen.flow(X_train[indices], Y_train[indices], batch_size=32),
+                                steps_per_epoch=max(1, len(indices) / 32), epochs=1,
+                                validation_data=(X_test, Y_test))
+            val_loss = history.history['val_loss'][-1]
+            if val_loss < best_val_loss:
+                best_val_loss = val_loss
+                epochs_without_improvement = 0
+            else:
+                epochs_without_improvement += 1
+                if epochs_without_improvement >= early_stopping.patience:
+                    break
+    else:
+        history_with_dropout = model_with_dropout.fit(datagen.flow(X_train, Y_train, batch_size=32),
+                            steps_per_epoch=len(X_train) / 32, epochs=64,
+                            validation_data=(X_test, Y_test),
+                            callbacks=[early_stopping])
+
+
+    test_loss_dropout, test_acc_dropout = model_with_dropout.evaluate(X_test, Y_test, verbose=2)
+    print('\nTest accuracy with dropout and data augmentation:', test_acc_dropout)
+    model_path = f"models/model_{test_acc_dropout}.h5"
+    model_with_dropout.save(model_path)
+
+    # Record the test split so `python -m core.evaluate` scores the model on
+    # images it has never been trained on
+    holdout_path = f"{os.path.splitext(model_path)[0]}.holdout.json"
+    with open(holdout_path, "w") as f:
+        json.dump({"samples": [[path, int(np.argmax(y))] for path, y in zip(paths_test, Y_test)]}, f)
+    print(f"Saved held-out file list to {holdout_path}")
+
+
+if __name__ == "__main__":
+    main()